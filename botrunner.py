@@ -0,0 +1,54 @@
+"""Bot process entry point shared by mainwindow.py and its frozen build.
+
+Kept free of PyQt5 so the bot process and its multiprocessing workers do not load Qt.
+"""
+import sys
+import os
+import multiprocessing
+
+RUN_BOT_FLAG = "--run-bot"   # Command line flag of the bot process started from the GUI
+BOT_PID_FILE = "bot.pid"     # Written in the working directory once the bot engine is loaded
+
+
+def read_bot_pid():
+    """Pid from the bot pid file, or None"""
+    try:
+        with open(BOT_PID_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def run_bot_engine(workdir):
+    """Run the bot in this process (same executable, started with --run-bot)"""
+    os.chdir(workdir)
+    # wikis_config.py and .env are read from the working directory, also in the frozen build
+    if workdir not in sys.path:
+        sys.path.insert(0, workdir)
+
+    import main
+
+    # The pid file lets a (restarted) GUI find this bot, and marks the engine as loaded
+    with open(BOT_PID_FILE, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    try:
+        main.run_bot()
+    finally:
+        if read_bot_pid() == os.getpid():
+            os.remove(BOT_PID_FILE)
+
+
+def dispatch():
+    """Handle non-GUI starts of the executable; returns False when the GUI should start"""
+    # Pool workers of the frozen build (--multiprocessing-fork) run and exit here
+    multiprocessing.freeze_support()
+
+    if RUN_BOT_FLAG in sys.argv:
+        run_bot_engine(os.getcwd())
+        return True
+    return False
+
+
+if __name__ == "__main__":
+    # Non-frozen bot process: python botrunner.py --run-bot
+    dispatch()
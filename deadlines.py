@@ -0,0 +1,60 @@
+# deadlines.py
+# Hạn chót (deadline) cho các request HTTP của mwclient: mỗi request, mỗi trang, mỗi lần chạy wiki.
+
+import time
+
+import requests
+
+
+class DeadlineExceeded(Exception):
+    """Hết thời gian của một ngân sách (name: "page", "wiki", ...)."""
+
+    def __init__(self, name, seconds):
+        super().__init__(f"hết hạn chót '{name}' ({seconds:g}s)")
+        self.name = name
+        self.seconds = seconds
+
+
+# === Session dùng làm `pool` cho mwclient.Site ===
+# Mỗi request lấy timeout = min(timeout cấu hình, thời gian còn lại của các hạn chót đang đặt),
+# và không gửi request nào khi đã hết hạn. Không kế thừa lỗi của requests để mwclient không retry.
+class DeadlineSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.deadlines = {}  # name -> (thời điểm hết hạn theo time.monotonic(), số giây)
+
+    def set_deadline(self, name, seconds):
+        self.deadlines[name] = (time.monotonic() + seconds, seconds)
+
+    def clear_deadline(self, name):
+        self.deadlines.pop(name, None)
+
+    def remaining(self):
+        """Thời gian còn lại của hạn chót gần nhất, None nếu không có hạn chót nào."""
+        # Bản sao: watchdog đọc từ luồng khác trong khi luồng chạy wiki đặt/xóa hạn chót
+        deadlines = list(self.deadlines.values())
+        if not deadlines:
+            return None
+        return min(end for end, _ in deadlines) - time.monotonic()
+
+    def check(self, needed=0):
+        """Ném DeadlineExceeded nếu không còn đủ `needed` giây."""
+        now = time.monotonic()
+        for name, (end, seconds) in sorted(list(self.deadlines.items()), key=lambda item: item[1][0]):
+            if end - now <= needed:
+                raise DeadlineExceeded(name, seconds)
+
+    def before_retry(self, sleeper, retries, args):
+        # wait_callback của mwclient: không ngủ chờ retry nếu lần ngủ đó vượt hạn chót
+        self.check(sleeper.retry_timeout * (retries - 1))
+
+    def request(self, method, url, **kwargs):
+        self.check()
+        remaining = self.remaining()
+        timeout = kwargs.get("timeout")
+        if remaining is not None and timeout is not None:
+            if isinstance(timeout, tuple):
+                kwargs["timeout"] = tuple(min(t, remaining) for t in timeout)
+            else:
+                kwargs["timeout"] = min(timeout, remaining)
+        return super().request(method, url, **kwargs)
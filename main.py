@@ -1,14 +1,23 @@
-from multiprocessing import Pool
+from multiprocessing import Pool, TimeoutError as PoolTimeout
+import argparse
+import json
 import os
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import mwclient
+import requests
 import schedule
 from wikis_config import WIKIS
+from deadlines import DeadlineExceeded, DeadlineSession
+from preflight import forget, preflight, wiki_host
+from profiler import WikiProfile, write_summary
 import sys
 
-sys.stdout.reconfigure(encoding='utf-8')
+# Bản đóng gói không có console (mainwindow.spec) thì sys.stdout là None
+if sys.stdout is not None:
+    sys.stdout.reconfigure(encoding='utf-8')
 
 # === Nạp biến môi trường ===
 load_dotenv()
@@ -18,9 +27,32 @@ PASSWORD = os.getenv("WIKI_PASS")
 if not USERNAME or not PASSWORD:
     raise RuntimeError("Thiếu WIKI_USER hoặc WIKI_PASS.")
 
-# === Ghi dấu lần chạy mới vào log.txt ===
-with open("log.txt", "a", encoding="utf-8") as f:
-    f.write("\n=== Chạy mới: {} ===\n".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+# === Cấu hình kiểm tra hoạt động gần đây ===
+CYCLE_MINUTES = 10          # Chu kỳ ping (phút)
+ACTIVE_EDITS_SKIP = 3       # Đủ số sửa đổi thật này thì bỏ qua ping cả wiki
+RC_STATE_FILE = "rc_state.json"  # Lưu mốc thời gian recentchanges giữa các chu kỳ
+
+# === Hạn chót (giây), có thể đổi bằng biến môi trường ===
+CONNECT_TIMEOUT = float(os.getenv("WIKI_CONNECT_TIMEOUT", 5))   # Kết nối TCP/TLS
+REQUEST_TIMEOUT = float(os.getenv("WIKI_REQUEST_TIMEOUT", 30))  # Chờ phản hồi của mỗi request
+PAGE_DEADLINE = float(os.getenv("WIKI_PAGE_DEADLINE", 90))      # Mỗi trang (đọc + lưu, kể cả retry)
+SETUP_DEADLINE = float(os.getenv("WIKI_SETUP_DEADLINE", 120))   # Kết nối + recentchanges + đăng nhập
+# Giới hạn trên cho mỗi lần chạy một wiki (mặc định 2 chu kỳ); ngân sách thực tính theo số trang, xem wiki_deadline()
+WIKI_DEADLINE = float(os.getenv("WIKI_RUN_DEADLINE", 2 * CYCLE_MINUTES * 60))
+WATCHDOG_GRACE = 10   # Giây vượt hạn chót (trang/wiki) trước khi watchdog bỏ dở lần chạy wiki
+WATCHDOG_INTERVAL = 1 # Giây giữa hai lần watchdog kiểm tra
+DEADLINE_GRACE = 15   # Giây chờ thêm trước khi tiến trình chính hủy worker bị treo
+# Giới hạn thời gian thực của một chu kỳ (khi số wiki <= POOL_SIZE):
+#   PREFLIGHT_DEADLINE + max(wiki_deadline()) + WATCHDOG_GRACE + WATCHDOG_INTERVAL (+ DEADLINE_GRACE dự phòng)
+# mặc định tối đa ~20 + 1200 + 11 + 15 giây. Timeout (connect, read) chỉ giới hạn từng lần đọc socket;
+# watchdog trong worker mới là giới hạn theo đồng hồ cho ngân sách trang và wiki.
+MAX_RETRIES = 2       # Số lần mwclient retry khi lỗi mạng / 5xx
+RETRY_TIMEOUT = 5     # Giây chờ tăng dần giữa các lần retry
+PAGE_PAUSE = 20       # Giây nghỉ giữa hai trang
+POOL_SIZE = 4
+
+# Kết quả preflight tốt (kèm cookie đăng nhập), dùng lại ở chu kỳ sau — chỉ trong tiến trình chính
+PREFLIGHT_CACHE = {}
 
 # === Hàm log chuẩn ===
 def log(msg, wiki_desc=None): 
@@ -32,13 +64,24 @@ def log(msg, wiki_desc=None):
     with open("log.txt", "a", encoding="utf-8") as f:
         f.write(full_msg + "\n")
 
+# === Lỗi mạng do hết thời gian (timeout của request, hoặc request bị cắt theo hạn chót) ===
+def is_timeout(error, session):
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    remaining = session.remaining()
+    return (isinstance(error, requests.exceptions.ConnectionError)
+            and remaining is not None and remaining <= 0)
+
 # === Hàm cập nhật trang ===
 def update_page(site, page_name, wiki_desc):
+    """Trả về trạng thái của trang: done/missing/protected/timeout/error."""
+    session = site.connection
+    session.set_deadline("page", PAGE_DEADLINE)
     try:
         page = site.pages[page_name]
         if not page.exists:
             log(f"[⚠] Trang không tồn tại: {page_name}", wiki_desc)
-            return
+            return "missing"
 
         log(f"[🟢] Tìm thấy trang: {page_name}", wiki_desc)
         current_text = page.text()
@@ -58,69 +101,304 @@ def update_page(site, page_name, wiki_desc):
 
         page.save(new_text, summary="Tự động cập nhật để giữ wiki hoạt động")
         log(f"[✓] Cập nhật thành công: {page_name}", wiki_desc)
+        return "done"
 
     except mwclient.errors.ProtectedPageError:
         log(f"[🔒] Trang bị khóa: {page_name}", wiki_desc)
+        return "protected"
+    except DeadlineExceeded as e:
+        # Hết hạn của cả wiki thì để process_wiki dừng lại
+        if e.name != "page":
+            raise
+        log(f"[⏱] Quá thời gian ({e.seconds:g}s), bỏ qua trang: {page_name}", wiki_desc)
+        return "timeout"
     except Exception as e:
+        if is_timeout(e, session):
+            log(f"[⏱] Hết thời gian chờ, bỏ qua trang: {page_name} ({e})", wiki_desc)
+            return "timeout"
         log(f"[X] Lỗi không xác định: {e}", wiki_desc)
+        return "error"
+    finally:
+        session.clear_deadline("page")
+
+# === Trạng thái recentchanges (mốc thời gian lần kiểm tra trước của mỗi wiki) ===
+def wiki_key(wiki):
+    return wiki_host(wiki) + wiki["path"]
+
+def load_rc_state():
+    try:
+        with open(RC_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_rc_state(state):
+    with open(RC_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+# === Tài khoản của bot trên wiki ===
+# WIKI_USER có thể là bot password dạng "Tên@Bot"; MediaWiki không nhận "@" trong tên người dùng
+def bot_account(site):
+    if getattr(site, "logged_in", False):
+        return site.username
+    return USERNAME.split("@")[0]
+
+# === Đếm sửa đổi thật kể từ lần kiểm tra trước (1 truy vấn) ===
+def count_recent_edits(site, since):
+    result = site.api(
+        "query",
+        http_method="GET",
+        list="recentchanges",
+        rcstart=since,
+        rcdir="newer",
+        rctype="edit|new",
+        rcshow="!bot",
+        rcexcludeuser=bot_account(site),
+        rcprop="timestamp",
+        rclimit=ACTIVE_EDITS_SKIP,
+    )
+    return len(result["query"]["recentchanges"])
+
+# === Chọn trang cần ping theo mức hoạt động ===
+def pages_to_ping(wiki, edits):
+    if edits >= ACTIVE_EDITS_SKIP:
+        return []
+    if edits > 0:
+        return wiki["pages"][:1]
+    return wiki["pages"]
+
+# === Kết nối wiki, dùng lại phiên đăng nhập (cookie) từ preflight nếu có ===
+def open_site(wiki, session, cookies=None):
+    session.headers["User-Agent"] = mwclient.client.USER_AGENT
+    if cookies is not None:
+        session.cookies.update(cookies)
+    return mwclient.Site(
+        host=wiki_host(wiki),
+        path=wiki['path'],
+        scheme="https",
+        pool=session,
+        max_retries=MAX_RETRIES,
+        retry_timeout=RETRY_TIMEOUT,
+        wait_callback=session.before_retry,
+        connection_options={"timeout": (CONNECT_TIMEOUT, REQUEST_TIMEOUT)}
+    )
+
+# === Ngân sách thời gian của một lần chạy wiki: đủ cho mọi trang kèm thời gian nghỉ ===
+def wiki_deadline(wiki):
+    budget = SETUP_DEADLINE + len(wiki["pages"]) * (PAGE_DEADLINE + PAGE_PAUSE)
+    if WIKI_DEADLINE:
+        budget = min(budget, WIKI_DEADLINE)
+    return budget
 
 # === Hàm xử lý từng wiki ===
-def process_wiki(wiki):
+def process_wiki(wiki, since=None, cookies=None, profile_dir=None):
+    """Trả về {"outcome": done/skipped/error/timeout, "checked_at": mốc recentchanges (UTC) hoặc None}."""
     desc = wiki["desc"]
     log(f"🌐 Bắt đầu xử lý wiki: {desc}", desc)
+    session = DeadlineSession()
+    session.set_deadline("wiki", wiki_deadline(wiki))
+    result = {}
+    profile = WikiProfile(profile_dir, wiki_key(wiki)) if profile_dir else None
+
+    def run():
+        try:
+            if profile:
+                profile.start()
+            result.update(run_wiki(wiki, session, since, cookies))
+        except Exception as e:
+            log(f"[X] Lỗi không xác định: {e}", desc)
+            result.update({"outcome": "error", "checked_at": None})
+
+    # Chạy trong luồng riêng; watchdog bỏ dở khi hạn chót đã quá WATCHDOG_GRACE theo đồng hồ
+    # (vd. server trả dữ liệu nhỏ giọt, không lần đọc nào chạm timeout của request)
+    runner = threading.Thread(target=run, name=f"wiki-{desc}", daemon=True)
+    runner.start()
+    while runner.is_alive():
+        runner.join(WATCHDOG_INTERVAL)
+        remaining = session.remaining()
+        if runner.is_alive() and remaining is not None and remaining < -WATCHDOG_GRACE:
+            log(f"[⏱] Watchdog: quá hạn chót hơn {WATCHDOG_GRACE}s, bỏ dở lần chạy wiki", desc)
+            break
+
+    session.close()
+    abandoned = runner.is_alive()
+    # Luồng còn treo kết thúc cùng worker (Pool dùng maxtasksperchild=1)
+    final = {"outcome": "timeout", "checked_at": None} if abandoned else dict(result)
+    if profile:
+        # Bỏ dở thì vẫn ghi profile dở dang: đây chính là wiki chậm cần xem
+        final["profile"] = profile.stop(partial=abandoned)
+    return final
+
+def run_wiki(wiki, session, since, cookies):
+    try:
+        return ping_wiki(wiki, session, since, cookies)
+    except DeadlineExceeded as e:
+        log(f"[⏱] Quá thời gian xử lý wiki ({e.seconds:g}s), dừng lại", wiki["desc"])
+        return {"outcome": "timeout", "checked_at": None}
+
+def ping_wiki(wiki, session, since, cookies):
+    desc = wiki["desc"]
     try:
-        site = mwclient.Site(
-            host=wiki['hostcheck'],
-            path=wiki['path'],
-            scheme="https"
-        )
-        site.login(USERNAME, PASSWORD)
+        site = open_site(wiki, session, cookies)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        log(f"[X] Không thể kết nối hoặc đăng nhập: {e}", desc)
-        return
+        if is_timeout(e, session):
+            log(f"[⏱] Hết thời gian khi kết nối: {e}", desc)
+            return {"outcome": "timeout", "checked_at": None}
+        log(f"[X] Không thể kết nối: {e}", desc)
+        return {"outcome": "error", "checked_at": None}
 
-    for i, page in enumerate(wiki["pages"]):
-        update_page(site, page, desc)
-        if i < len(wiki["pages"]) - 1:
-            time.sleep(20)
-            log("⏳ Tạm dừng 20s...", desc)
+    now = datetime.now(timezone.utc)
+    checked_at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if since is None:
+        since = (now - timedelta(minutes=CYCLE_MINUTES)).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    log(f"✅ Hoàn tất: {desc}", desc)
+    pages = wiki["pages"]
+    try:
+        edits = count_recent_edits(site, since)
+        pages = pages_to_ping(wiki, edits)
+        log(f"[📈] {edits} sửa đổi gần đây (từ {since}), sẽ ping {len(pages)}/{len(wiki['pages'])} trang", desc)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        log(f"[⚠] Không kiểm tra được recentchanges, ping toàn bộ: {e}", desc)
+        checked_at = None
 
-# === Hàm chạy toàn bộ wiki ===
-def update_all_pages():
-    log("🔄 Bắt đầu cập nhật toàn bộ wiki...")
-    with Pool(processes=4) as pool:
-        pool.map(process_wiki, WIKIS)
+    if not pages:
+        log(f"✅ Wiki đang hoạt động, bỏ qua ping: {desc}", desc)
+        return {"outcome": "skipped", "checked_at": checked_at}
 
-# === Chạy thử 1 wiki đầu tiên ===
-def test_first_wiki():
-    test_wiki = WIKIS[0]
-    desc = test_wiki['desc']
+    # Phiên từ preflight có thể đã hết hạn
+    relogin = not getattr(site, "logged_in", False)
     try:
-        site = mwclient.Site(
-            host=test_wiki['hostcheck'],
-            path=test_wiki['path'],
-            scheme="https"
-        )
-        site.login(USERNAME, PASSWORD)
-        log(f"[✔] Đăng nhập thành công vào wiki thử: {desc}")
+        if relogin:
+            site.login(USERNAME, PASSWORD)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        log(f"[X] Thử kết nối thất bại: {e}")
-        exit(1)
+        # Không ping được: giữ mốc cũ để chu kỳ sau vẫn tính các sửa đổi trong khoảng này
+        if is_timeout(e, session):
+            log(f"[⏱] Hết thời gian khi đăng nhập: {e}", desc)
+            return {"outcome": "timeout", "checked_at": None}
+        log(f"[X] Không thể đăng nhập: {e}", desc)
+        return {"outcome": "error", "checked_at": None}
+
+    statuses = []
+    for i, page in enumerate(pages):
+        statuses.append(update_page(site, page, desc))
+        if i < len(pages) - 1:
+            # Không ngủ nếu sau đó đã hết hạn của wiki
+            session.check(PAGE_PAUSE)
+            time.sleep(PAGE_PAUSE)
+            log(f"⏳ Tạm dừng {PAGE_PAUSE}s...", desc)
+
+    # Không trang nào được ping thì giữ mốc recentchanges cũ
+    if "done" not in statuses:
+        checked_at = None
+    if "timeout" in statuses:
+        log(f"[⏱] Xong nhưng {statuses.count('timeout')}/{len(statuses)} trang quá thời gian: {desc}", desc)
+        return {"outcome": "timeout", "checked_at": checked_at, "relogin": relogin}
+
+    log(f"✅ Hoàn tất: {desc}", desc)
+    return {"outcome": "done", "checked_at": checked_at, "relogin": relogin}
+
+# === Preflight song song: trả về [(wiki, cookies)] của các wiki sẵn sàng ===
+def run_preflight():
+    start = time.perf_counter()
+    results = preflight(WIKIS, USERNAME, PASSWORD, PREFLIGHT_CACHE)
+    healthy = []
+    for wiki, result in zip(WIKIS, results):
+        desc = wiki["desc"]
+        if result["cached"]:
+            log("[✔] Preflight: dùng lại kết quả và phiên đăng nhập trước", desc)
+        elif result["ok"]:
+            log(f"[✔] Preflight: DNS/TLS/API/đăng nhập OK ({result['elapsed']:.1f}s)", desc)
+        else:
+            log(f"[X] Preflight lỗi ở bước {result['stage']}: {result['error']} — bỏ qua wiki này", desc)
+        if result["ok"]:
+            healthy.append((wiki, result["cookies"]))
+
+    log(f"🩺 Preflight: {len(healthy)}/{len(WIKIS)} wiki sẵn sàng ({time.perf_counter() - start:.1f}s)")
+    return healthy
+
+# === Hàm chạy toàn bộ wiki (profile_dir: đo chu kỳ bằng cProfile/tracemalloc trong từng worker) ===
+def update_all_pages(profile_dir=None):
+    log("🔄 Bắt đầu cập nhật toàn bộ wiki...")
+    healthy = run_preflight()
+    if not healthy:
+        log("[X] Không có wiki nào sẵn sàng, bỏ qua chu kỳ này.")
+        return
+
+    rc_state = load_rc_state()
+    jobs = [(wiki, rc_state.get(wiki_key(wiki)), cookies) for wiki, cookies in healthy]
+    cycle_start = time.perf_counter()
+
+    # Giới hạn cứng của chu kỳ: worker nào chưa xong sau hạn này sẽ bị hủy khi đóng Pool
+    # (Pool giao việc cho worker rảnh trước: tổng/POOL_SIZE + lớn nhất là cận trên khi nhiều wiki hơn worker)
+    budgets = [wiki_deadline(wiki) + WATCHDOG_GRACE + WATCHDOG_INTERVAL for wiki, _, _ in jobs]
+    if len(jobs) <= POOL_SIZE:
+        cycle_budget = max(budgets)
+    else:
+        cycle_budget = sum(budgets) / POOL_SIZE + max(budgets)
+    cycle_deadline = time.monotonic() + cycle_budget + DEADLINE_GRACE
+
+    results = []
+    breakdowns = []
+    # maxtasksperchild=1: luồng bị watchdog bỏ dở không sống tiếp sang wiki khác
+    with Pool(processes=POOL_SIZE, maxtasksperchild=1) as pool:
+        pending = [pool.apply_async(process_wiki, job + (profile_dir,)) for job in jobs]
+
+        for (wiki, _, _), async_result in zip(jobs, pending):
+            try:
+                result = async_result.get(timeout=max(cycle_deadline - time.monotonic(), 0))
+            except PoolTimeout:
+                log("[⏱] Worker bị treo quá hạn chót của chu kỳ, hủy bỏ", wiki["desc"])
+                result = {"outcome": "timeout", "checked_at": None}
+            except Exception as e:
+                log(f"[X] Worker lỗi: {e}", wiki["desc"])
+                result = {"outcome": "error", "checked_at": None}
+            if result.get("profile"):
+                breakdowns.append(result["profile"])
+            results.append(result)
+    # Thoát khỏi `with` gọi pool.terminate(), dừng cả các worker còn treo
+
+    if profile_dir:
+        missing = [(wiki_key(wiki), result["outcome"])
+                   for (wiki, _, _), result in zip(jobs, results) if not result.get("profile")]
+        for line in write_summary(profile_dir, breakdowns, time.perf_counter() - cycle_start, missing):
+            log(line)
+
+    for (wiki, _, _), result in zip(jobs, results):
+        if result["checked_at"]:
+            rc_state[wiki_key(wiki)] = result["checked_at"]
+        # Không tin kết quả preflight đã lưu nữa: chu kỳ sau kiểm tra lại và lấy phiên mới
+        if result["outcome"] in ("error", "timeout") or result.get("relogin"):
+            forget(wiki, PREFLIGHT_CACHE)
+    save_rc_state(rc_state)
+
+    summary = ", ".join(f"{wiki['desc']}: {result['outcome']}" for (wiki, _, _), result in zip(jobs, results))
+    log(f"📋 Kết quả chu kỳ ({time.perf_counter() - cycle_start:.1f}s): {summary}")
+
+# === Chạy chính (dùng chung cho `python main.py` và mainwindow) ===
+def run_bot(profile_dir=None):
+    # Ghi dấu lần chạy mới vào log.txt (chỉ tiến trình chính, không ghi lại trong các worker của Pool)
+    with open("log.txt", "a", encoding="utf-8") as f:
+        f.write("\n=== Chạy mới: {} ===\n".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
 
-# === Chạy chính ===
-if __name__ == "__main__":
     start_time = time.time()
 
-    test_first_wiki()  # kiểm tra wiki đầu tiên
+    # Chế độ profile: chỉ chạy một chu kỳ rồi thoát
+    if profile_dir:
+        update_all_pages(profile_dir)
+        return
 
-    # Gọi lần đầu tiên ngay khi khởi chạy
+    # Gọi lần đầu tiên ngay khi khởi chạy (preflight kiểm tra mọi wiki ở đầu mỗi chu kỳ)
     update_all_pages()
 
-    # Lên lịch chạy mỗi 10 phút
-    schedule.every(10).minutes.do(update_all_pages)
-    print("🤖 Bot đang chạy thử nghiệm, sẽ cập nhật mỗi 10 phút...")
+    # Lên lịch chạy mỗi CYCLE_MINUTES phút
+    schedule.every(CYCLE_MINUTES).minutes.do(update_all_pages)
+    print(f"🤖 Bot đang chạy thử nghiệm, sẽ cập nhật mỗi {CYCLE_MINUTES} phút...")
 
     try:
         # Vòng lặp chờ
@@ -134,5 +412,14 @@ if __name__ == "__main__":
     total_minutes = round((end_time - start_time) / 60, 2)
     log(f"🏁 Tất cả đã xử lý xong. Thời gian: {total_minutes} phút.")
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bot giữ hoạt động cho các wiki Hyggshi OS")
+    parser.add_argument(
+        "--profile", nargs="?", const="profile", metavar="DIR",
+        help="Profile một chu kỳ (cProfile + tracemalloc cho từng wiki) rồi thoát, ghi file vào DIR (mặc định: profile)"
+    )
+    args = parser.parse_args()
+    run_bot(profile_dir=args.profile)
+
 # === Kết thúc chương trình ===
 # Chương trình đã hoàn thành cập nhật các wiki và ghi log đầy đủ.
\ No newline at end of file
@@ -1,8 +1,16 @@
 import sys
 import os
+
+from botrunner import BOT_PID_FILE, RUN_BOT_FLAG, dispatch, read_bot_pid
+
+# The bot process and the Pool workers of the frozen build start this same executable:
+# handle them before PyQt5 is imported, so they never load Qt
+if __name__ == "__main__" and dispatch():
+    sys.exit()
+
+import time
 import subprocess
 import importlib.util
-import psutil
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QTextEdit,
     QVBoxLayout, QHBoxLayout, QMessageBox, QCheckBox,
@@ -11,25 +19,71 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QFont
 
+# psutil and mwclient (via main.py) are imported on demand to keep GUI startup fast
+
+
+def _bot_command():
+    """Command line that runs the bot engine with this same executable / Python"""
+    if getattr(sys, "frozen", False):
+        return [sys.executable, RUN_BOT_FLAG]
+    # botrunner.py as the main script: spawned Pool workers re-import it, not this Qt module
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "botrunner.py"),
+            RUN_BOT_FLAG]
+
+
+def _launcher(proc):
+    """Onefile bootloader that started `proc` (parent running the same executable), or None"""
+    import psutil
+
+    if not getattr(sys, "frozen", False):
+        return None
+    try:
+        parent = proc.parent()
+        if parent is not None and parent.exe() == proc.exe():
+            return parent
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        pass
+    return None
+
+
+def _rss_mb(processes):
+    """Total resident memory of the given psutil processes in MB"""
+    import psutil
+
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
 class WikiBotWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Wiki Bot Manager")
         self.setGeometry(300, 100, 900, 700)
         self.process = None
+        self.popen = None
         self.selected_wikis = set()
         self.dark_mode_enabled = False
+        self.startup_seconds = None
+        self.bot_started_at = None
+        self.bot_startup_seconds = None
 
         self.create_ui()
         
         # Initialize timer for log updates
         self.timer = QTimer()
         self.timer.timeout.connect(self.load_log)
+        self.timer.timeout.connect(self.refresh_metrics)
         self.timer.start(2000)
         
         # Initial setup
         self.load_log()
-        self.check_bot_status()
+        # Process checks need psutil, run them once the window is shown
+        QTimer.singleShot(0, self._after_startup)
 
     def create_ui(self):
         """Create the user interface"""
@@ -64,6 +118,10 @@ class WikiBotWindow(QWidget):
         self.status_label = QLabel("⚫ Bot không chạy")
         self.status_label.setStyleSheet("font-weight: bold; padding: 5px; color: red;")
 
+        # Startup time / memory usage
+        self.metrics_label = QLabel("⏱ Đang đo...")
+        self.metrics_label.setStyleSheet("color: gray; font-size: 11px; padding: 2px;")
+
         # Wiki selection controls
         self.select_all_checkbox = QCheckBox("Chạy tất cả wiki")
         self.select_all_checkbox.stateChanged.connect(self.toggle_all_wikis)
@@ -130,6 +188,7 @@ class WikiBotWindow(QWidget):
         layout.addWidget(self.wiki_groupbox)
         layout.addWidget(QLabel("📋 Log Output:"))
         layout.addWidget(self.log_view)
+        layout.addWidget(self.metrics_label)
 
         self.setLayout(layout)
 
@@ -213,10 +272,32 @@ class WikiBotWindow(QWidget):
         for cb in self.wiki_checkboxes:
             cb.setChecked(checked)
 
+    def _after_startup(self):
+        """Record GUI startup time, then do the initial process checks"""
+        import psutil
+
+        # Measured from process creation, so interpreter startup is included. In the onefile
+        # build this process is the bootloader's child: start from the bootloader instead,
+        # so unpacking the archive is counted too
+        gui_proc = psutil.Process()
+        first = _launcher(gui_proc) or gui_proc
+        self.startup_seconds = time.time() - first.create_time()
+        self.check_bot_status()
+        self.refresh_metrics()
+
     def check_bot_status(self):
         """Check if bot process is currently running"""
+        import psutil
+
         self.process = None
         current_dir = os.getcwd()
+
+        # Bot started from a GUI (possibly an earlier, closed one)
+        pid_file_process = self._find_pid_file_process()
+        if pid_file_process:
+            self.process = pid_file_process
+            self._update_status(True, "🟢 Bot đang chạy", "green")
+            return
         
         try:
             for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cwd']):
@@ -240,10 +321,31 @@ class WikiBotWindow(QWidget):
 
     def _is_bot_process(self, cmdline, proc_cwd, current_dir):
         """Check if process matches our bot criteria"""
-        return (cmdline and len(cmdline) >= 2 and 
+        if not cmdline or proc_cwd != current_dir:
+            return False
+        # Bot started by the GUI: mainwindow(.exe|.py) --run-bot
+        if RUN_BOT_FLAG in cmdline:
+            return True
+        # Bot started directly: python main.py
+        return (len(cmdline) >= 2 and 
                 any(python in cmdline[0].lower() for python in ['python', 'python.exe']) and
-                'main.py' in cmdline[1] and
-                proc_cwd == current_dir)
+                'main.py' in cmdline[1])
+
+    def _find_pid_file_process(self):
+        """Running bot process recorded in the pid file, or None"""
+        import psutil
+
+        pid = read_bot_pid()
+        if pid is None:
+            return None
+        try:
+            proc = psutil.Process(pid)
+            # Guard against a reused pid
+            if RUN_BOT_FLAG in proc.cmdline() and proc.status() != psutil.STATUS_ZOMBIE:
+                return proc
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+        return None
 
     def _update_status(self, running, text, color):
         """Update the bot status display"""
@@ -266,8 +368,8 @@ class WikiBotWindow(QWidget):
                               "Vui lòng chọn ít nhất một wiki hoặc bật 'Chạy tất cả wiki'.")
             return
 
-        # Check main.py exists
-        if not os.path.exists("main.py"):
+        # Check main.py exists (the frozen build bundles it)
+        if not getattr(sys, "frozen", False) and not os.path.exists("main.py"):
             QMessageBox.critical(self, "Lỗi", "Không tìm thấy file main.py")
             return
 
@@ -277,47 +379,59 @@ class WikiBotWindow(QWidget):
             QMessageBox.critical(self, "Lỗi", f"Không thể chạy bot:\n{str(e)}")
 
     def _start_bot_process(self):
-        """Start the bot process"""
+        """Start the bot engine in a child process of this executable"""
         # Set environment variable for wiki filtering
         wiki_filter = ("ALL" if self.select_all_checkbox.isChecked() 
                       else ",".join(self.selected_wikis))
         os.environ["WIKI_FILTER"] = wiki_filter
 
-        # Create subprocess
+        # Re-run this executable with --run-bot, so no system Python is needed in the frozen build.
+        # A separate process (not a multiprocessing child) can keep running after the GUI closes.
+        self.bot_startup_seconds = None
+        self.bot_started_at = time.perf_counter()
         if os.name == 'nt':  # Windows
-            self.process = subprocess.Popen(
-                ["python", "main.py"],
+            self.popen = subprocess.Popen(
+                _bot_command(),
                 creationflags=subprocess.CREATE_NO_WINDOW,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 cwd=os.getcwd()
             )
         else:  # Unix/Linux/Mac
-            self.process = subprocess.Popen(
-                ["python", "main.py"],
+            self.popen = subprocess.Popen(
+                _bot_command(),
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 cwd=os.getcwd()
             )
-        
+
         # Convert to psutil Process for better control
+        import psutil
+
         try:
-            self.process = psutil.Process(self.process.pid)
+            self.process = psutil.Process(self.popen.pid)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
+            self.process = None
         
         self._update_status(True, "🟢 Bot đang chạy", "green")
         QMessageBox.information(self, "Đã chạy", "Wiki Bot đang chạy.")
 
     def stop_bot(self):
         """Stop the wiki bot with comprehensive process termination"""
+        import psutil
+
         killed_processes = []
         current_dir = os.getcwd()
         
         try:
-            # Method 1: Kill stored process
+            # Method 1: Kill stored process (and the one recorded in the pid file)
             if self.process:
                 killed_processes.extend(self._terminate_process_tree(self.process))
+            pid_file_process = self._find_pid_file_process()
+            if pid_file_process:
+                killed_processes.extend(self._terminate_process_tree(pid_file_process))
+            if self.popen:
+                self.popen.poll()
 
             # Method 2: Search and kill matching processes
             for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cwd']):
@@ -337,6 +451,10 @@ class WikiBotWindow(QWidget):
             if not killed_processes and os.name == 'nt':
                 self._windows_force_kill()
 
+            # Terminated engines cannot clean up their pid file
+            if self._find_pid_file_process() is None and os.path.exists(BOT_PID_FILE):
+                os.remove(BOT_PID_FILE)
+
             # Update UI state
             self._reset_bot_state()
             
@@ -354,6 +472,8 @@ class WikiBotWindow(QWidget):
 
     def _terminate_process_tree(self, process):
         """Terminate a process and its children"""
+        import psutil
+
         killed = []
         try:
             if hasattr(process, 'is_running') and process.is_running():
@@ -397,14 +517,72 @@ class WikiBotWindow(QWidget):
             if result.stdout and 'main.py' in result.stdout:
                 subprocess.run(['taskkill', '/F', '/IM', 'python.exe'], 
                              capture_output=True, timeout=10)
+
+            # Bot started by a GUI (mainwindow.exe --run-bot): kill its tree by pid
+            pid = read_bot_pid()
+            if pid is not None:
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)],
+                             capture_output=True, timeout=10)
         except Exception:
             pass
 
     def _reset_bot_state(self):
         """Reset bot state after stopping"""
         self.process = None
+        self.popen = None
+        self.bot_started_at = None
+        self.bot_startup_seconds = None
         self._update_status(False, "⚫ Bot không chạy", "red")
 
+    def refresh_metrics(self):
+        """Show startup time and memory usage of the GUI and the bot"""
+        if self.startup_seconds is None:
+            return
+
+        # Bot started here exited by itself (e.g. missing credentials)
+        if self.popen is not None and self.popen.poll() is not None:
+            self._reset_bot_state()
+
+        try:
+            import psutil
+
+            gui_proc = psutil.Process()
+            gui_mb = _rss_mb([gui_proc] + [p for p in [_launcher(gui_proc)] if p is not None])
+            text = f"⏱ GUI khởi động: {self.startup_seconds:.2f}s | 💾 GUI: {gui_mb:.1f} MB"
+
+            if self._is_bot_running():
+                bot_proc = self.process
+                # The engine writes the pid file once main.py is imported. In the onefile
+                # build it is the child of the started bootloader, not the Popen pid
+                bot_pid = read_bot_pid()
+                if (self.bot_startup_seconds is None and self.bot_started_at is not None
+                        and bot_pid is not None and self._is_bot_tree_pid(bot_pid)):
+                    self.bot_startup_seconds = time.perf_counter() - self.bot_started_at
+                # Bot found through the pid file: count its onefile bootloader as well
+                if bot_proc.pid == bot_pid:
+                    bot_proc = _launcher(bot_proc) or bot_proc
+                if bot_proc is not None:
+                    bot_tree = [bot_proc] + bot_proc.children(recursive=True)
+                    bot_mb = _rss_mb(bot_tree)
+                    startup = (f"{self.bot_startup_seconds:.2f}s"
+                               if self.bot_startup_seconds is not None else "...")
+                    text += (f" | 🤖 Bot khởi động: {startup}, {bot_mb:.1f} MB "
+                             f"({len(bot_tree)} tiến trình) | Tổng: {gui_mb + bot_mb:.1f} MB")
+
+            self.metrics_label.setText(text)
+        except Exception as e:
+            self.metrics_label.setText(f"⏱ Không đo được tài nguyên: {e}")
+
+    def _is_bot_tree_pid(self, pid):
+        """Whether pid is the started bot process or one of its descendants"""
+        import psutil
+
+        try:
+            return (pid == self.process.pid or
+                    pid in {child.pid for child in self.process.children(recursive=True)})
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
     def load_log(self):
         """Load and display log file content"""
         log_path = "log.txt"
@@ -545,6 +723,10 @@ class WikiBotWindow(QWidget):
                 self.stop_bot()
                 event.accept()
             elif reply == QMessageBox.No:
+                # Detach: the bot is a separate process and keeps running; a restarted GUI
+                # finds it again through the pid file / command line
+                self.process = None
+                self.popen = None
                 event.accept()
             else:
                 event.ignore()
@@ -553,11 +735,13 @@ class WikiBotWindow(QWidget):
 
     def _is_bot_running(self):
         """Check if bot is currently running"""
+        if self.popen is not None and self.popen.poll() is not None:
+            return False
         try:
-            return (self.process and 
+            return bool(self.process and 
                    hasattr(self.process, 'is_running') and 
                    self.process.is_running())
-        except (psutil.NoSuchProcess, AttributeError):
+        except Exception:
             return False
 
 def main():
@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['wikis_config'],  # read from the working directory at runtime
     noarchive=False,
     optimize=0,
 )
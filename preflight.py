@@ -0,0 +1,109 @@
+# preflight.py
+# Kiểm tra song song tất cả wiki trước mỗi chu kỳ: DNS, TLS, API và đăng nhập.
+
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import mwclient
+import requests
+
+PREFLIGHT_TIMEOUT = 5         # Giây cho mỗi bước kết nối / mỗi request
+PREFLIGHT_DEADLINE = 20       # Giây tối đa cho toàn bộ preflight
+PREFLIGHT_CACHE_MINUTES = 30  # Thời gian dùng lại kết quả tốt ở các chu kỳ sau
+
+# === Tên host chuẩn hóa (chữ thường, vd. "hyggshi-os-Korea.fandom.com") ===
+def wiki_host(wiki):
+    return wiki["hostcheck"].strip().lower()
+
+def cache_key(wiki):
+    return (wiki_host(wiki), wiki["path"])
+
+# === Kiểm tra một wiki, trả về dict kết quả (không ném lỗi) ===
+def check_wiki(wiki, username, password, timeout=PREFLIGHT_TIMEOUT):
+    host = wiki_host(wiki)
+    start = time.monotonic()
+    result = {"ok": False, "stage": "dns", "error": None, "cookies": None,
+              "cached": False, "checked_at": time.time()}
+    session = requests.Session()
+    session.headers["User-Agent"] = mwclient.client.USER_AGENT
+    try:
+        socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+
+        result["stage"] = "tls"
+        context = ssl.create_default_context()
+        with socket.create_connection((host, 443), timeout=timeout) as sock:
+            with context.wrap_socket(sock, server_hostname=host):
+                pass
+
+        result["stage"] = "api"
+        site = mwclient.Site(
+            host=host,
+            path=wiki["path"],
+            scheme="https",
+            pool=session,
+            max_retries=0,
+            connection_options={"timeout": timeout}
+        )
+
+        result["stage"] = "login"
+        site.login(username, password)
+
+        # Bản sao cookie: phiên của preflight được đóng ngay bên dưới
+        cookies = requests.cookies.RequestsCookieJar()
+        cookies.update(session.cookies)
+        result["ok"] = True
+        result["cookies"] = cookies
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    finally:
+        session.close()
+
+    result["elapsed"] = time.monotonic() - start
+    return result
+
+# === Kiểm tra mọi wiki cùng lúc; cache giữ kết quả tốt giữa các chu kỳ ===
+def preflight(wikis, username, password, cache,
+              timeout=PREFLIGHT_TIMEOUT, deadline=PREFLIGHT_DEADLINE,
+              cache_minutes=PREFLIGHT_CACHE_MINUTES):
+    """Trả về danh sách kết quả theo đúng thứ tự của `wikis`."""
+    now = time.time()
+    results = [None] * len(wikis)
+    pending = {}
+
+    for i, wiki in enumerate(wikis):
+        cached = cache.get(cache_key(wiki))
+        if cached and now - cached["checked_at"] < cache_minutes * 60:
+            results[i] = dict(cached, cached=True)
+        else:
+            pending[i] = wiki
+
+    if pending:
+        executor = ThreadPoolExecutor(max_workers=len(pending))
+        futures = {
+            executor.submit(check_wiki, wiki, username, password, timeout): i
+            for i, wiki in pending.items()
+        }
+        done, _ = wait(futures, timeout=deadline)
+        # Không chờ các luồng bị treo (vd. DNS không có timeout), wiki đó bị loại ở chu kỳ này
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future, i in futures.items():
+            if future in done:
+                results[i] = future.result()
+            else:
+                results[i] = {"ok": False, "stage": "timeout", "cookies": None, "cached": False,
+                              "error": f"quá {deadline}s", "checked_at": now, "elapsed": deadline}
+
+    for wiki, result in zip(wikis, results):
+        if result["ok"]:
+            cache[cache_key(wiki)] = result
+        else:
+            cache.pop(cache_key(wiki), None)
+
+    return results
+
+# === Bỏ kết quả đã lưu của một wiki (worker gặp lỗi hoặc phiên đã hết hạn) ===
+def forget(wiki, cache):
+    cache.pop(cache_key(wiki), None)
@@ -0,0 +1,139 @@
+# profiler.py
+# Chế độ --profile của main.py: đo một chu kỳ update_all_pages trong từng worker của Pool.
+
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005  # Giây giữa hai lần lấy mẫu stack
+TOP_ALLOCATIONS = 20     # Số dòng cấp phát bộ nhớ lớn nhất ghi ra file
+
+# Hàm C mà thời gian nằm trong đó được tính là chờ mạng (DNS, TCP, TLS, đọc/ghi socket)
+NETWORK_MARKERS = ("_socket.", "_ssl.", "getaddrinfo", "select.")
+SLEEP_MARKERS = ("time.sleep",)
+# Hàm ghi log của bot: (tên file, tên hàm)
+LOGGING_FUNCS = {("main.py", "log")}
+
+# === Lấy mẫu stack của luồng đang chạy để tạo file collapsed-stack (flamegraph) ===
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def slugify(name):
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "wiki"
+
+# === Phân loại thời gian từ kết quả cProfile ===
+def time_breakdown(stats, wall, cpu):
+    network = sleep = logging_time = 0.0
+    for (filename, _, funcname), (_, _, tottime, cumtime, _) in stats.items():
+        if filename == "~":
+            if any(marker in funcname for marker in SLEEP_MARKERS):
+                sleep += tottime
+            elif any(marker in funcname for marker in NETWORK_MARKERS):
+                network += tottime
+        elif (os.path.basename(filename), funcname) in LOGGING_FUNCS:
+            logging_time += cumtime
+
+    return {
+        "wall": wall,
+        "network": network,
+        "sleep": sleep,
+        "logging": logging_time,
+        "cpu_other": max(wall - network - sleep - logging_time, 0.0),
+        "cpu_time": cpu,
+    }
+
+# === Profile một lần chạy wiki (cProfile + tracemalloc + lấy mẫu stack), ghi file cho `name` vào out_dir ===
+# start() gọi trong luồng chạy wiki (cProfile chỉ đo luồng gọi enable()); stop() có thể gọi từ luồng khác,
+# kể cả khi luồng chạy wiki còn treo (watchdog bỏ dở) — khi đó ghi bản dở dang.
+class WikiProfile:
+    def __init__(self, out_dir, name):
+        self.out_dir = out_dir
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.sampler = None
+
+    def start(self):
+        self.sampler = StackSampler(threading.get_ident())
+        tracemalloc.start()
+        self.sampler.start()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.profiler.enable()
+
+    def stop(self, partial=False):
+        """Ghi .pstats/.collapsed/.memory.txt, trả về bảng phân loại thời gian (None nếu chưa start)."""
+        if self.sampler is None:
+            return None
+
+        self.profiler.disable()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        self.sampler.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, slugify(self.name))
+        self.profiler.dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"Đỉnh bộ nhớ (tracemalloc): {peak / 1024:.1f} KiB\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        breakdown = time_breakdown(self.profiler.stats, wall, cpu)
+        breakdown["name"] = self.name
+        breakdown["peak_kib"] = peak / 1024
+        breakdown["partial"] = partial
+        return breakdown
+
+# === Tổng hợp các worker thành summary.txt, trả về các dòng để ghi log ===
+# missing: [(tên, outcome)] của các wiki không có profile (worker bị hủy hoặc lỗi)
+def write_summary(out_dir, breakdowns, cycle_wall, missing=()):
+    lines = [f"📊 Profile chu kỳ: {cycle_wall:.2f}s (wall) — file trong {out_dir}"]
+    for b in breakdowns:
+        line = (
+            f"  {b['name']}: wall {b['wall']:.2f}s = mạng {b['network']:.2f}s"
+            f" + ngủ {b['sleep']:.2f}s + log {b['logging']:.2f}s"
+            f" + CPU/khác {b['cpu_other']:.2f}s"
+            f" | CPU đo được {b['cpu_time']:.2f}s | đỉnh bộ nhớ {b['peak_kib']:.0f} KiB"
+        )
+        if b.get("partial"):
+            # disable() tính thời gian của các lời gọi chưa trả về (vd. recv đang treo) tới lúc dừng
+            line += " | ⚠ dở dang (bị watchdog bỏ dở, xem lời gọi đang treo trong .collapsed)"
+        lines.append(line)
+    for name, outcome in missing:
+        lines.append(f"  {name}: ⚠ không có profile (outcome: {outcome}, worker bị hủy hoặc lỗi trước khi ghi file)")
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return lines